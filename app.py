@@ -1,17 +1,24 @@
 import streamlit as st
 from langchain_groq import ChatGroq
+from groq import APIError
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import StrOutputParser
-import pdfkit
-import tempfile
+from langchain_core.output_parsers import StrOutputParser, JsonOutputParser
+from pydantic import BaseModel, Field
+from langchain_core.globals import set_llm_cache
+from langchain_community.cache import SQLiteCache
+import io
 import json 
 import os
-import base64
-from datetime import datetime
-import docx
-from docx import Document
 from dotenv import load_dotenv
-import re
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+import httpx
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pdf_render import render_pdf
 
 
 
@@ -23,15 +30,58 @@ st.set_page_config(
     page_icon="📄"
 )
 
-# Load environment variables
-load_dotenv()
+# Streamlit re-executes this script on every widget interaction, so one-time
+# setup is cached for the lifetime of the process
+@st.cache_resource
+def load_env():
+    """Load environment variables"""
+    load_dotenv()
+
+load_env()
 
 # Configure PDFKit path
 WKHTMLTOPDF_PATH = r'C:\Program Files\wkhtmltopdf\bin\wkhtmltopdf.exe'
-config = pdfkit.configuration(wkhtmltopdf=WKHTMLTOPDF_PATH) if os.path.exists(WKHTMLTOPDF_PATH) else None
+
+# Export libraries are imported on first use so plain reruns skip loading them
+@st.cache_resource(show_spinner=False)
+def get_pdf_pool():
+    """Long-lived worker processes: renderers load once per worker and documents render in parallel"""
+    # Spawn rather than fork: forking would copy the server's threads, event loop and HTTP pools.
+    # Spawned workers re-import this script as __mp_main__, so main() stays behind its guard
+    return ProcessPoolExecutor(
+        max_workers=os.cpu_count(),
+        mp_context=multiprocessing.get_context("spawn")
+    )
+
+def render_pdfs(contents: list):
+    """Render several documents to PDF concurrently in the worker pool"""
+    pool = get_pdf_pool()
+    try:
+        futures = [pool.submit(render_pdf, content, WKHTMLTOPDF_PATH) for content in contents]
+        return [future.result() for future in futures]
+    except BrokenProcessPool:
+        # A dead worker breaks the pool for good; drop it so the next export starts a fresh one
+        get_pdf_pool.clear()
+        raise
 
 # Configuration
 GROQ_API_KEY = st.secrets["GROQ_API_KEY"]
+# Speculative-decoding deployment by default; the fallback serves requests if it errors
+GROQ_MODEL = os.getenv("GROQ_MODEL", "llama-3.3-70b-specdec")
+GROQ_FALLBACK_MODEL = os.getenv("GROQ_FALLBACK_MODEL", "llama-3.3-70b-versatile")
+# Context window of GROQ_MODEL; prompt plus max_tokens must fit inside it
+GROQ_CONTEXT_TOKENS = int(os.getenv("GROQ_CONTEXT_TOKENS", "8192"))
+# Persist LLM responses across sessions so identical prompts skip Groq
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".langchain.db")
+CACHE_TTL = 24 * 60 * 60
+
+@st.cache_resource
+def init_llm_cache():
+    """Install the persistent LLM cache once per process"""
+    set_llm_cache(SQLiteCache(database_path=LLM_CACHE_PATH))
+
+init_llm_cache()
+
 LANGUAGES = ["English", "Spanish", "French", "German", "Chinese"]
 TEMPLATE_OPTIONS = ["Chronological", "Functional", "Combined"]
 
@@ -45,140 +95,470 @@ if "reference_letters" not in st.session_state:
 if "interview_prep" not in st.session_state:
     st.session_state.interview_prep = {}
 
-def init_groq_chain():
-    """Initialize Groq model"""
-    return ChatGroq(
-        groq_api_key=GROQ_API_KEY,
-        model_name="llama-3.3-70b-specdec",
-        temperature=0.4,
-        max_tokens=4000
+# Output token budget per task; decode time grows with every generated token
+MAX_TOKENS = {
+    "linkedin": 800,
+    "resume_content": 2500,
+    "cover_letter": 1500,
+    "interview_guide": 2000,
+    "salary_guide": 1200,
+    "reference_letter": 800,
+    "full_package": 5000
+}
+
+# Stop sequences for tasks whose prompt asks for an explicit terminator,
+# so decoding ends there instead of running on with commentary
+STOP_SEQUENCES = {
+    "resume_content": ("</resume>",)
+}
+
+@st.cache_resource
+def get_http_clients():
+    """Keep-alive HTTP/2 connection pools shared by every Groq client"""
+    limits = httpx.Limits(max_connections=20, max_keepalive_connections=20)
+    return (
+        httpx.Client(http2=True, timeout=60, limits=limits),
+        httpx.AsyncClient(http2=True, timeout=60, limits=limits)
     )
 
-def linkedin_import(url: str):
-    """Improved LinkedIn profile import with proper template escaping"""
-    try:
-        # Validate LinkedIn URL format
-        if not url.startswith("https://www.linkedin.com/in/"):
-            raise ValueError("Invalid LinkedIn profile URL format")
+@st.cache_resource
+def get_event_loop():
+    """Long-lived event loop, so pooled async connections outlive each request"""
+    loop = asyncio.new_event_loop()
+    threading.Thread(target=loop.run_forever, daemon=True).start()
+    return loop
+
+def run_async(coroutine):
+    """Run a coroutine on the shared event loop and wait for its result"""
+    return asyncio.run_coroutine_threadsafe(coroutine, get_event_loop()).result()
 
-        # Use proper escaping for JSON template
-        system_prompt = (
-            'Extract professional details from LinkedIn profile in strict JSON format: \n'
-            '{{\n'
-            '    "name": "Full Name",\n'
-            '    "experience": ["Position1 at Company1", "Position2 at Company2"],\n'
-            '    "education": ["Degree1 at School1", "Degree2 at School2"],\n'
-            '    "skills": ["Skill1", "Skill2", "Skill3"]\n'
-            '}}'
+@st.cache_resource
+def init_groq_chain(max_tokens: int = 2000, stop: tuple = None):
+    """Initialize Groq model (one instance per token budget, shared across reruns)"""
+    http_client, http_async_client = get_http_clients()
+
+    def build_model(model_name: str):
+        return ChatGroq(
+            groq_api_key=GROQ_API_KEY,
+            model_name=model_name,
+            temperature=0.4,
+            max_tokens=max_tokens,
+            stop=list(stop) if stop else None,
+            streaming=True,
+            http_client=http_client,
+            http_async_client=http_async_client
         )
 
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", system_prompt),
-            ("human", "Profile URL: {url}")
-        ])
-        
-        chain = prompt | init_groq_chain() | StrOutputParser()
-        response = chain.invoke({"url": url})
-        
-        # Extract and validate JSON
-        json_str = re.search(r'\{.*\}', response, re.DOTALL)
-        if not json_str:
-            raise ValueError("No valid JSON found in response")
-            
-        parsed_data = json.loads(json_str.group())
-        
-        # Validate required fields
-        required_fields = ["name", "experience", "education", "skills"]
-        if not all(field in parsed_data for field in required_fields):
-            raise ValueError("Missing required fields in parsed data")
-            
-        return parsed_data
-        
-    except Exception as e:
-        st.error(f"LinkedIn import error: {str(e)}")
-        return {}
+    model = build_model(GROQ_MODEL)
+    if GROQ_FALLBACK_MODEL and GROQ_FALLBACK_MODEL != GROQ_MODEL:
+        model = model.with_fallbacks([build_model(GROQ_FALLBACK_MODEL)])
+    return model
 
-def generate_localized_content(prompt_template: str, language: str, context: dict):
-    """Generate content in specified language"""
-    # Merge language into context
-    full_context = {**context, "language": language}
-    localized_prompt = f"{prompt_template} \nRespond in {language} language"
-    chain = ChatPromptTemplate.from_template(localized_prompt) | init_groq_chain() | StrOutputParser()
-    return chain.invoke(full_context)
+# Prompt templates
+# Use proper escaping for JSON template
+LINKEDIN_SYSTEM_PROMPT = (
+    'Extract professional details from LinkedIn profile in strict JSON format: \n'
+    '{{\n'
+    '    "name": "Full Name",\n'
+    '    "experience": ["Position1 at Company1", "Position2 at Company2"],\n'
+    '    "education": ["Degree1 at School1", "Degree2 at School2"],\n'
+    '    "skills": ["Skill1", "Skill2", "Skill3"]\n'
+    '}}'
+)
 
-# Salary Negotiation Functions
-def salary_guide(context: dict):
-    prompt = """Generate salary negotiation advice for:
+# Shared leading system message; keeping it byte-identical across tasks lets
+# Groq reuse the cached prefill of the candidate profile
+PROFILE_SYSTEM_PROMPT = """Candidate profile (JSON):
+{resume_json}"""
+
+RESUME_PROMPT = """Create {language} resume with template: {template}
+    ATS-friendly, include every section of the candidate profile
+    Write </resume> on its own line after the last section"""
+
+COVER_LETTER_PROMPT = """Write {language} cover letter for the candidate profile
+    Job: {job_desc}"""
+
+SALARY_PROMPT = """Generate salary negotiation advice for:
     Industry: {industry}
     Experience: {experience} years
     Location: {location}
     Current Salary: {current_salary}
     Include: Market rates, negotiation strategies, benefits considerations"""
-    return generate_localized_content(prompt, context['language'], context)
 
-# Interview Preparation Functions  
-def interview_preparation(context: dict):
-    prompt = """Generate interview preparation guide for:
+INTERVIEW_PROMPT = """Generate interview preparation guide for:
     Position: {position}
     Company Type: {company_type}
     Technical Skills: {skills}
     Include: Common questions, STAR method examples, technical tests preparation"""
-    return generate_localized_content(prompt, context['language'], context)
 
-# Reference Letter Generator
-def generate_reference_letter(context: dict):
-    prompt = """Write professional reference letter from:
+REFERENCE_PROMPT = """Write professional reference letter from:
     Referee: {referee_name}
     Relationship: {relationship}
     Duration: {duration}
     Key achievements: {achievements}
     Contact: {contact_info}"""
-    return generate_localized_content(prompt, context['language'], context)
 
-def create_download_link(content, format_type, filename):
-    """Generate download links with proper file handling"""
-    try:
-        # Create temporary file path
-        temp_path = os.path.join(tempfile.gettempdir(), f"{filename}.{format_type}")
-        
-        # Generate file content
-        if format_type == "pdf":
-            if config is None:
-                raise RuntimeError("PDF export requires wkhtmltopdf installation")
-            pdfkit.from_string(content, temp_path, configuration=config)
-        elif format_type == "docx":
-            doc = Document()
-            doc.add_paragraph(content)
-            doc.save(temp_path)
-        else:  # txt
-            with open(temp_path, "w", encoding="utf-8") as f:
-                f.write(content)
-        
-        # Read generated file
-        with open(temp_path, "rb") as f:
-            data = f.read()
-        
-        # Create download link
-        b64 = base64.b64encode(data).decode()
-        download_link = f'<a href="data:application/octet-stream;base64,{b64}" download="{filename}.{format_type}">Download {format_type.upper()}</a>'
+FULL_PACKAGE_PROMPT = """Prepare a complete {language} job application package for the candidate profile.
+    Resume template: {template}
+    Target job: {job_desc}
+    Interview: company type {company_type}, technical skills {skills}
+    Salary: industry {industry}, {experience} years of experience, location {location}, current salary {current_salary}
+    Reference letter from: referee {referee_name}, relationship {relationship}, duration {duration}, contact {contact_info}
+    Reference letter key achievements: {achievements}
+    Return JSON with keys: resume, cover_letter, interview_guide, salary_guide, reference_letter
+    {format_instructions}
+    Respond in {language} language"""
+
+# Single-document tasks, keyed like their session state results
+LOCALIZED_PROMPTS = {
+    "resume_content": RESUME_PROMPT,
+    "cover_letter": COVER_LETTER_PROMPT,
+    "interview_guide": INTERVIEW_PROMPT,
+    "salary_guide": SALARY_PROMPT,
+    "reference_letter": REFERENCE_PROMPT
+}
+
+class CareerPackage(BaseModel):
+    """Schema of the batched full-package reply"""
+    resume: str = Field(description="ATS-friendly resume in markdown using the requested template")
+    cover_letter: str = Field(description="Cover letter tailored to the target job")
+    interview_guide: str = Field(description="Interview guide: common questions, STAR method examples, technical tests preparation")
+    salary_guide: str = Field(description="Salary negotiation advice: market rates, negotiation strategies, benefits considerations")
+    reference_letter: str = Field(description="Professional reference letter written by the referee")
+
+# Session state key for each CareerPackage field
+PACKAGE_SESSION_KEYS = {
+    "resume": "resume_content",
+    "cover_letter": "cover_letter",
+    "interview_guide": "interview_guide",
+    "salary_guide": "salary_guide",
+    "reference_letter": "reference_letter"
+}
+
+@st.cache_resource
+def compile_prompts():
+    """Compile every prompt template once per process"""
+    prompts = {
+        task: ChatPromptTemplate.from_messages([
+            ("system", PROFILE_SYSTEM_PROMPT),
+            ("human", f"{template} \nRespond in {{language}} language")
+        ])
+        for task, template in LOCALIZED_PROMPTS.items()
+    }
+    prompts["linkedin"] = ChatPromptTemplate.from_messages([
+        ("system", LINKEDIN_SYSTEM_PROMPT),
+        ("human", "Profile URL: {url}")
+    ])
+    prompts["full_package"] = ChatPromptTemplate.from_messages([
+        ("system", PROFILE_SYSTEM_PROMPT),
+        ("human", FULL_PACKAGE_PROMPT)
+    ]).partial(
+        format_instructions=JsonOutputParser(pydantic_object=CareerPackage).get_format_instructions()
+    )
+    return prompts
+
+@st.cache_resource
+def get_chain(task: str):
+    """Build the prompt | model | parser chain for a task once per process"""
+    return compile_prompts()[task] | init_groq_chain(MAX_TOKENS[task], STOP_SEQUENCES.get(task)) | StrOutputParser()
+
+@st.cache_data(show_spinner=False, ttl=CACHE_TTL)
+def fetch_linkedin_profile(url: str):
+    """Ask the model for a LinkedIn profile summary (cached per URL)"""
+    return get_chain("linkedin").invoke({"url": url})
+
+LINKEDIN_REQUIRED_FIELDS = frozenset({"name", "experience", "education", "skills"})
+JSON_DECODER = json.JSONDecoder()
+
+def extract_json_object(text: str):
+    """Return the first JSON object embedded in text"""
+    start = text.find("{")
+    while start != -1:
+        try:
+            # raw_decode stops at the end of the object, so trailing prose is ignored
+            return JSON_DECODER.raw_decode(text, start)[0]
+        except (json.JSONDecodeError, RecursionError):
+            # Not an object from this brace (or nested too deeply); it may begin at a later one,
+            # including one inside this failed candidate
+            start = text.find("{", start + 1)
+    raise ValueError("No valid JSON found in response")
+
+def normalize_entries(value, separator: str = "\n"):
+    """Coerce a model-returned list field into the list of strings session state expects"""
+    if isinstance(value, str):
+        return split_entries(value, separator)
+    if not isinstance(value, list):
+        raise ValueError("Profile list fields must be lists or strings")
+    entries = []
+    for entry in value:
+        # Models sometimes return objects such as {"title": ..., "company": ...}
+        if isinstance(entry, dict):
+            entry = ", ".join(str(item) for item in entry.values())
+        entry = str(entry).strip()
+        if entry:
+            entries.append(entry)
+    return entries
+
+def parse_linkedin(response: str) -> dict:
+    """Extract and validate the profile JSON, raising ValueError when it is unusable"""
+    parsed_data = extract_json_object(response)
+    
+    # Validate required fields
+    if not LINKEDIN_REQUIRED_FIELDS.issubset(parsed_data):
+        raise ValueError("Missing required fields in parsed data")
+    if not isinstance(parsed_data["name"], str):
+        raise ValueError("Profile name must be a string")
         
-        return download_link
-    except Exception as e:
+    return {
+        **parsed_data,
+        "experience": normalize_entries(parsed_data["experience"]),
+        "education": normalize_entries(parsed_data["education"]),
+        "skills": normalize_entries(parsed_data["skills"], ",")
+    }
+
+def linkedin_import(url: str):
+    """Improved LinkedIn profile import with proper template escaping"""
+    try:
+        # Validate LinkedIn URL format
+        if not url.startswith("https://www.linkedin.com/in/"):
+            raise ValueError("Invalid LinkedIn profile URL format")
+
+        return parse_linkedin(fetch_linkedin_profile(url))
+    except (ValueError, APIError) as e:
+        st.error(f"LinkedIn import error: {str(e)}")
+        return {}
+
+# Streaming skips both st.cache_data and the SQLite LLM cache, so finished text is kept here
+GENERATION_CACHE_SIZE = 128
+
+@st.cache_resource
+def generation_cache():
+    """Finished generations shared across sessions, in least-recently-used order"""
+    return threading.Lock(), OrderedDict()
+
+def store_generation(key: tuple, stream):
+    """Pass a token stream through and cache the full text once it completes"""
+    chunks = []
+    for chunk in stream:
+        chunks.append(chunk)
+        yield chunk
+    lock, entries = generation_cache()
+    with lock:
+        entries[key] = (time.monotonic(), "".join(chunks))
+        entries.move_to_end(key)
+        while len(entries) > GENERATION_CACHE_SIZE:
+            entries.popitem(last=False)
+
+def generate_localized_content(task: str, language: str, context: dict):
+    """Stream content in specified language as tokens arrive, replaying cached text for repeated inputs"""
+    # Merge language into context
+    full_context = {**context, "language": language}
+    key = (task, json.dumps(full_context, ensure_ascii=False, sort_keys=True))
+    lock, entries = generation_cache()
+    with lock:
+        cached = entries.get(key)
+        if cached and time.monotonic() - cached[0] < CACHE_TTL:
+            entries.move_to_end(key)
+            return [cached[1]]
+    return store_generation(key, get_chain(task).stream(full_context))
+
+async def agenerate_localized_content(chain, language: str, context: dict):
+    """Generate content in specified language without blocking the event loop"""
+    # The chain is resolved by the caller: cached resources need the script thread
+    full_context = {**context, "language": language}
+    return await chain.ainvoke(full_context)
+
+def write_stream_once(stream):
+    """Paint a token stream live, then clear it so the stored result renders once"""
+    placeholder = st.empty()
+    with placeholder.container():
+        content = st.write_stream(stream)
+    placeholder.empty()
+    return content
+
+# Salary Negotiation Functions
+def salary_guide(context: dict):
+    return generate_localized_content("salary_guide", context['language'], context)
+
+# Interview Preparation Functions  
+def interview_preparation(context: dict):
+    return generate_localized_content("interview_guide", context['language'], context)
+
+# Reference Letter Generator
+def generate_reference_letter(context: dict):
+    return generate_localized_content("reference_letter", context['language'], context)
+
+# List fields stay structured in session state and are joined only for display
+def split_entries(text: str, separator: str = "\n"):
+    return [entry.strip() for entry in text.split(separator) if entry.strip()]
+
+# Context builders shared by the per-tab buttons and the full package
+def serialize_resume_data():
+    """Compact JSON rendering of the resume data for prompts, with a stable key order"""
+    return json.dumps(
+        st.session_state.resume_data,
+        ensure_ascii=False,
+        separators=(',', ':'),
+        sort_keys=True
+    )
+
+def resume_context():
+    return {
+        "resume_json": serialize_resume_data(),
+        "template": "Chronological"
+    }
+
+def cover_letter_context():
+    return {
+        "resume_json": serialize_resume_data(),
+        "job_desc": st.session_state.resume_data.get("job_description", "")
+    }
+
+def interview_context():
+    return {
+        "resume_json": serialize_resume_data(),
+        "language": st.session_state.language,
+        "position": st.session_state.resume_data.get("job_description", ""),
+        "company_type": st.session_state.interview_prep.get("company_type", ""),
+        "skills": st.session_state.interview_prep.get("technical_skills", "")
+    }
+
+def salary_context():
+    return {
+        "resume_json": serialize_resume_data(),
+        "language": st.session_state.language,
+        "industry": st.session_state.get("salary_industry", ""),
+        "experience": st.session_state.get("salary_experience", 0),
+        "location": st.session_state.get("salary_location", ""),
+        "current_salary": st.session_state.get("salary_current", 0)
+    }
+
+def reference_context():
+    return {
+        "resume_json": serialize_resume_data(),
+        "language": st.session_state.language,
+        "referee_name": st.session_state.get("ref_name", ""),
+        "relationship": st.session_state.get("ref_relationship", ""),
+        "duration": st.session_state.get("ref_duration", ""),
+        "achievements": "\n".join(st.session_state.resume_data.get("experience", [])),
+        "contact_info": st.session_state.get("ref_title", "")
+    }
+
+def section_contexts():
+    """Context for each single-document task, keyed like LOCALIZED_PROMPTS"""
+    return {
+        "resume_content": resume_context(),
+        "cover_letter": cover_letter_context(),
+        "interview_guide": interview_context(),
+        "salary_guide": salary_context(),
+        "reference_letter": reference_context()
+    }
+
+async def generate_package_concurrently(language: str, jobs: dict):
+    """Run the independent generators at once so latency is the slowest call, not the sum"""
+    results = await asyncio.gather(*(
+        agenerate_localized_content(chain, language, context)
+        for chain, context in jobs.values()
+    ))
+    return dict(zip(jobs, results))
+
+def estimate_tokens(text: str):
+    """Conservative token estimate (about three characters per token)"""
+    return len(text) // 3 + 1
+
+def package_fits_context(language: str, context: dict):
+    """Whether the batched prompt plus its output budget fits the model's context window"""
+    # Section contexts already carry "language", so merge rather than pass it twice
+    prompt = compile_prompts()["full_package"].format(**{**context, "language": language})
+    return estimate_tokens(prompt) + MAX_TOKENS["full_package"] <= GROQ_CONTEXT_TOKENS
+
+def package_context(contexts: dict):
+    """Union of every section's context for the batched prompt"""
+    merged = {}
+    for context in contexts.values():
+        merged.update(context)
+    return merged
+
+@st.cache_data(show_spinner=False, ttl=CACHE_TTL)
+def generate_full_package(language: str, context: dict):
+    """Generate every section in one call, paying prefill and the round-trip once"""
+    # Strict parsing: a reply cut off at max_tokens is never complete JSON, so it raises
+    # here instead of being partially parsed into a package and cached
+    package = CareerPackage.model_validate(extract_json_object(
+        get_chain("full_package").invoke({**context, "language": language})
+    ))
+    return {
+        PACKAGE_SESSION_KEYS[field]: content
+        for field, content in package.model_dump().items()
+    }
+
+MIME_TYPES = {
+    "pdf": "application/pdf",
+    "docx": "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "txt": "text/plain"
+}
+
+def build_document(content, format_type):
+    """Render content to file bytes in memory"""
+    if format_type == "pdf":
+        return render_pdfs([content])[0]
+    if format_type == "docx":
+        from docx import Document
+        doc = Document()
+        doc.add_paragraph(content)
+        buffer = io.BytesIO()
+        doc.save(buffer)
+        return buffer.getvalue()
+    return content.encode("utf-8")
+
+@st.cache_data(show_spinner=False, max_entries=32)
+def render_document(content, format_type):
+    """Cached rendering, so reruns with unchanged content reuse the bytes"""
+    return build_document(content, format_type)
+
+# Session state keys of generated documents and their export file names
+EXPORT_DOCUMENTS = {
+    "resume_content": "resume",
+    "cover_letter": "cover_letter",
+    "interview_guide": "interview_guide",
+    "salary_guide": "salary_guide",
+    "reference_letter": "reference_letter"
+}
+
+def render_pdf_archive(documents: dict):
+    """Render documents to PDF in parallel and bundle them into a zip"""
+    import zipfile
+
+    pdfs = render_pdfs(list(documents.values()))
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for filename, pdf in zip(documents, pdfs):
+            archive.writestr(f"{filename}.pdf", pdf)
+    return buffer.getvalue()
+
+def create_download_button(content, format_type, filename):
+    """Render a download button serving the document as raw bytes"""
+    try:
+        data = render_document(content, format_type)
+    except (RuntimeError, OSError, ValueError) as e:
+        # RuntimeError: no PDF renderer installed; OSError: wkhtmltopdf failed;
+        # ValueError: python-docx rejects NUL and control characters in the text
         st.error(f"Error generating {format_type}: {str(e)}")
-        return ""
-    finally:
-        # Clean up temporary file
-        try:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-        except Exception as cleanup_error:
-            st.error(f"Error cleaning up files: {str(cleanup_error)}")
+        return
+    st.download_button(
+        label=f"Download {format_type.upper()}",
+        data=data,
+        file_name=f"{filename}.{format_type}",
+        mime=MIME_TYPES[format_type],
+        key=f"download_{filename}"
+    )
 
 def main():
     # PDF instructions moved inside main()
     st.sidebar.markdown("""
     **PDF Export Requirements:**
-    1. [Download wkhtmltopdf](https://wkhtmltopdf.org/downloads.html)
+    1. [Install WeasyPrint](https://doc.courtbouillon.org/weasyprint/stable/first_steps.html) (preferred), or
+    [download wkhtmltopdf](https://wkhtmltopdf.org/downloads.html)
     2. Install with default settings
     3. Restart this application
     """)
@@ -196,18 +576,37 @@ def main():
         linkedin_url = st.text_input("Paste LinkedIn Profile URL")
         if st.button("Import Profile"):
             if linkedin_url:
-                try:
-                    imported_data = linkedin_import(linkedin_url)
-                    if imported_data:
-                        st.session_state.resume_data.update({
+                # linkedin_import reports its own errors and returns {} on failure
+                imported_data = linkedin_import(linkedin_url)
+                if imported_data:
+                    st.session_state.resume_data.update({
                         "name": imported_data.get("name", ""),
-                        "experience": "\n".join(imported_data.get("experience", [])),
-                        "education": "\n".join(imported_data.get("education", [])),
-                        "skills": ", ".join(imported_data.get("skills", []))
-                         })
+                        "experience": imported_data.get("experience", []),
+                        "education": imported_data.get("education", []),
+                        "skills": imported_data.get("skills", [])
+                    })
                     st.success("Profile imported successfully!")
-                except Exception as e:
-                    st.error(f"Failed to process LinkedIn profile: {str(e)}")
+
+        st.divider()
+        st.header("Full Package")
+        if st.button("Generate Full Package"):
+            with st.spinner("Generating all documents..."):
+                # Session state and cached chains are read here, on the script thread,
+                # not inside the event loop
+                contexts = section_contexts()
+                merged_context = package_context(contexts)
+                package = None
+                if package_fits_context(st.session_state.language, merged_context):
+                    try:
+                        package = generate_full_package(st.session_state.language, merged_context)
+                    except ValueError:
+                        # The batched reply was truncated, not valid JSON, or missing sections
+                        pass
+                if package is None:
+                    # Too large for one call, or unparseable: fall back to one call per section
+                    jobs = {task: (get_chain(task), context) for task, context in contexts.items()}
+                    package = run_async(generate_package_concurrently(st.session_state.language, jobs))
+                st.session_state.update(package)
 
         
     # Main Tabs
@@ -221,62 +620,66 @@ def main():
 
     with tab1:  # Resume Builder
         with st.form("resume_form"):
+            resume_data = st.session_state.resume_data
             col1, col2 = st.columns(2)
             with col1:
                 st.subheader("Personal Information")
-                st.session_state.resume_data["name"] = st.text_input("Full Name")
-                st.session_state.resume_data["email"] = st.text_input("Email")
-                st.session_state.resume_data["phone"] = st.text_input("Phone")
+                resume_data["name"] = st.text_input("Full Name", value=resume_data.get("name", ""))
+                resume_data["email"] = st.text_input("Email")
+                resume_data["phone"] = st.text_input("Phone")
                 
                 st.subheader("Education")
-                st.session_state.resume_data["education"] = st.text_area("Education Details", height=150)
+                resume_data["education"] = split_entries(st.text_area(
+                    "Education Details",
+                    value="\n".join(resume_data.get("education", [])),
+                    height=150
+                ))
                 
             with col2:
                 st.subheader("Professional Details")
-                st.session_state.resume_data["experience"] = st.text_area("Work Experience", height=200)
-                st.session_state.resume_data["skills"] = st.text_area("Skills (comma-separated)", height=100)
-                st.session_state.resume_data["job_description"] = st.text_area("Target Job Description", height=150)
+                resume_data["experience"] = split_entries(st.text_area(
+                    "Work Experience",
+                    value="\n".join(resume_data.get("experience", [])),
+                    height=200
+                ))
+                resume_data["skills"] = split_entries(st.text_area(
+                    "Skills (comma-separated)",
+                    value=", ".join(resume_data.get("skills", [])),
+                    height=100
+                ), ",")
+                resume_data["job_description"] = st.text_area("Target Job Description", height=150)
             
             if st.form_submit_button("Generate Resume"):
-                resume_content = generate_localized_content(
-                    """Create {language} resume with template: {template}
-                    ATS-friendly, include: {sections}""",
+                resume_content = write_stream_once(generate_localized_content(
+                    "resume_content",
                     st.session_state.language,
-                    {
-                        "template": "Chronological",
-                        "sections": str(st.session_state.resume_data)
-                    }
-                )
+                    resume_context()
+                ))
                 st.session_state.resume_content = resume_content
 
         if "resume_content" in st.session_state:
             st.markdown(st.session_state.resume_content, unsafe_allow_html=True)
-            st.markdown(create_download_link(
+            create_download_button(
                 st.session_state.resume_content, 
                 export_format.lower(),
                 "resume"
-            ), unsafe_allow_html=True)
+            )
 
     with tab2:  # Cover Letters
         if st.button("Generate Cover Letter"):
-            st.session_state.cover_letter = generate_localized_content(
-                """Write {language} cover letter for:
-                Resume: {resume}
-                Job: {job_desc}""",
+            st.session_state.cover_letter = write_stream_once(generate_localized_content(
+                "cover_letter",
                 st.session_state.language,
-                {
-                    "resume": str(st.session_state.resume_data),
-                    "job_desc": st.session_state.resume_data.get("job_description", "")
-                }
-            )
+                cover_letter_context()
+            ))
         
         if st.session_state.cover_letter:
             st.markdown(st.session_state.cover_letter, unsafe_allow_html=True)
-            st.markdown(create_download_link(
+            create_download_button(
                 st.session_state.cover_letter,
                 export_format.lower(),
                 "cover_letter"
-            ), unsafe_allow_html=True)
+            )
 
     with tab3:  # Interview Prep
         col1, col2 = st.columns(2)
@@ -287,12 +690,7 @@ def main():
             st.session_state.interview_prep["technical_skills"] = st.text_input("Technical Skills Required")
             
             if st.button("Generate Prep Guide"):
-                st.session_state.interview_guide = interview_preparation({
-                    "language": st.session_state.language,
-                    "position": st.session_state.resume_data.get("job_description", ""),
-                    "company_type": st.session_state.interview_prep["company_type"],
-                    "skills": st.session_state.interview_prep["technical_skills"]
-                })
+                st.session_state.interview_guide = write_stream_once(interview_preparation(interview_context()))
         
         with col2:
             if "interview_guide" in st.session_state:
@@ -303,20 +701,14 @@ def main():
         with st.form("salary_form"):
             col1, col2 = st.columns(2)
             with col1:
-                industry = st.text_input("Industry")
-                experience = st.number_input("Years of Experience", min_value=0)
+                st.text_input("Industry", key="salary_industry")
+                st.number_input("Years of Experience", min_value=0, key="salary_experience")
             with col2:
-                location = st.text_input("Location")
-                current_salary = st.number_input("Current Salary", min_value=0)
+                st.text_input("Location", key="salary_location")
+                st.number_input("Current Salary", min_value=0, key="salary_current")
             
             if st.form_submit_button("Generate Guide"):
-                st.session_state.salary_guide = salary_guide({
-                    "language": st.session_state.language,
-                    "industry": industry,
-                    "experience": experience,
-                    "location": location,
-                    "current_salary": current_salary
-                })
+                st.session_state.salary_guide = write_stream_once(salary_guide(salary_context()))
         
         if "salary_guide" in st.session_state:
             st.markdown(st.session_state.salary_guide)
@@ -324,28 +716,43 @@ def main():
     with tab5:  # References
         st.subheader("Reference Letter Generator")
         with st.form("reference_form"):
-            ref_name = st.text_input("Referee Name")
-            ref_title = st.text_input("Referee Position")
-            relationship = st.text_input("Your Relationship")
-            duration = st.text_input("Working Duration")
+            st.text_input("Referee Name", key="ref_name")
+            st.text_input("Referee Position", key="ref_title")
+            st.text_input("Your Relationship", key="ref_relationship")
+            st.text_input("Working Duration", key="ref_duration")
             
             if st.form_submit_button("Generate Letter"):
-                st.session_state.reference_letter = generate_reference_letter({
-                    "language": st.session_state.language,
-                    "referee_name": ref_name,
-                    "relationship": relationship,
-                    "duration": duration,
-                    "achievements": st.session_state.resume_data.get("experience", ""),
-                    "contact_info": f"{ref_title}"
-                })
+                st.session_state.reference_letter = write_stream_once(generate_reference_letter(reference_context()))
         
         if "reference_letter" in st.session_state:
             st.markdown(st.session_state.reference_letter)
-            st.markdown(create_download_link(
+            create_download_button(
                 st.session_state.reference_letter,
                 export_format.lower(),
                 "reference_letter"
-            ), unsafe_allow_html=True)
+            )
+
+    with st.sidebar:
+        documents = {
+            filename: st.session_state[key]
+            for key, filename in EXPORT_DOCUMENTS.items()
+            if st.session_state.get(key)
+        }
+        if documents and st.button("Prepare PDFs"):
+            try:
+                with st.spinner("Rendering PDFs..."):
+                    st.session_state.pdf_archive = (documents, render_pdf_archive(documents))
+            except (RuntimeError, OSError) as e:
+                st.error(f"Error generating pdf: {str(e)}")
+        # Kept in session state so the download survives reruns until the documents change
+        prepared = st.session_state.get("pdf_archive")
+        if prepared and prepared[0] == documents:
+            st.download_button(
+                label="Download All as PDF",
+                data=prepared[1],
+                file_name="career_documents.zip",
+                mime="application/zip"
+            )
 
 if __name__ == "__main__":
     main()
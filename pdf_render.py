@@ -0,0 +1,37 @@
+"""PDF rendering that runs inside worker processes
+
+Kept out of app.py because Streamlit executes app.py as __main__, and
+functions defined there cannot be pickled into a process pool.
+"""
+import os
+from functools import lru_cache
+
+
+@lru_cache(maxsize=1)
+def load_weasyprint():
+    """WeasyPrint's HTML renderer, or None when it or its native Pango libraries are missing"""
+    try:
+        from weasyprint import HTML
+    except (ImportError, OSError):
+        return None
+    return HTML
+
+@lru_cache(maxsize=None)
+def get_pdfkit_config(wkhtmltopdf_path: str):
+    """PDFKit configuration, or None when wkhtmltopdf is not installed"""
+    if os.path.exists(wkhtmltopdf_path):
+        import pdfkit
+        return pdfkit.configuration(wkhtmltopdf=wkhtmltopdf_path)
+    return None
+
+def render_pdf(content: str, wkhtmltopdf_path: str):
+    """Render content to PDF bytes, preferring in-process WeasyPrint over wkhtmltopdf"""
+    HTML = load_weasyprint()
+    if HTML is not None:
+        return HTML(string=content).write_pdf()
+    config = get_pdfkit_config(wkhtmltopdf_path)
+    if config is not None:
+        import pdfkit
+        # An output path of False makes pdfkit return the PDF bytes
+        return pdfkit.from_string(content, False, configuration=config)
+    raise RuntimeError("PDF export requires WeasyPrint or wkhtmltopdf installation")